@@ -16,224 +16,590 @@ Usage:
     python polaris_branch_setter.py
 """
 
+import concurrent.futures
+import hashlib
+import logging
 import os
+import random
 import sys
+import tempfile
+import threading
 import requests
 import json
 import time
 from typing import Optional, Dict, Any
-from urllib.parse import urljoin
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import ijson
+except ImportError:
+    # Optional; full listings fall back to parsing the whole body at once
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    # Optional; response decoding falls back to the stdlib json module
+    orjson = None
+
+try:
+    import brotli  # noqa: F401  (only probed so we don't advertise br without a decoder)
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("polaris")
+
+# Lifetime of the on-disk project-ID cache; the IDs are effectively
+# immutable, the TTL just bounds how long a deleted project can linger
+PROJECT_CACHE_TTL_SECONDS = 3600
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize a JSON request body to bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+# The minimal default-branch PATCH body never varies, so serialize it once
+MINIMAL_DEFAULT_PATCH_BODY = _dumps({'isDefault': True})
+
+# How long a full branch listing may serve name lookups before it is
+# considered stale; short because the polling loop is waiting for a new
+# branch to appear
+BRANCH_CACHE_TTL_SECONDS = 15.0
 
 
 class PolarisAPI:
-    def __init__(self, server_url: str, access_token: str):
+    def __init__(self, server_url: str, access_token: str,
+                 connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 auth_scheme: str = 'api-token'):
         self.server_url = server_url.rstrip('/')
+        # Normalized once; all endpoints are same-origin relative paths, so
+        # plain concatenation replaces a full urljoin per request
+        self._base = self.server_url + '/'
         self.access_token = access_token
-        
-        print(f"Initialized Polaris API client")
-        print(f"Server: {self.server_url}")
-
-    def _get_headers(self, extra_headers: Dict[str, str] = None) -> Dict[str, str]:
-        """Get headers for API requests."""
-        headers = {
-            'Api-Token': self.access_token,
-            'Accept': 'application/json'
-        }
-        
-        if extra_headers:
-            headers.update(extra_headers)
-            
-        return headers
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Some Polaris deployments authenticate with a Bearer token instead
+        # of the Api-Token header
+        if auth_scheme == 'api-token':
+            self._auth_headers = {'Api-Token': access_token}
+        elif auth_scheme == 'bearer':
+            self._auth_headers = {'Authorization': f'Bearer {access_token}'}
+        else:
+            raise ValueError(f"Unknown auth_scheme: {auth_scheme}")
+
+        # Reuse one keep-alive connection pool for all API calls instead of
+        # opening a fresh TCP+TLS connection per request
+        self.session = requests.Session()
+        self.session.headers.update(dict(self._auth_headers, Accept='application/json'))
+        # Ask explicitly for compressed list payloads; brotli only when a
+        # decoder is importable
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate' + (', br' if brotli else '')
+        # Retry transient server errors and rate limits at the HTTP layer with
+        # exponential backoff (urllib3 caps the delay at 30s) so a single
+        # 502/503/504 during the long polling loop doesn't kill the run
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'PATCH']),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Cleared the first time the server answers HEAD with 405
+        self._head_supported = True
+
+        # Log the negotiated Content-Encoding on the first response only
+        self._encoding_logged = False
+
+        # Memoized branches URL for the current project context; the polling
+        # loop hits it dozens of times
+        self._project_context = None
+        self._branches_url = None
+
+        # Briefly cached name->branch dicts, keyed by project, used when the
+        # filtered lookup is unavailable
+        self._branches_cache = {}
+
+        # Pay the DNS + TCP + TLS handshake in the background so the first
+        # real API call finds a warm pooled connection
+        threading.Thread(target=self._warm_up_connection, daemon=True).start()
+
+        logger.info("Initialized Polaris API client")
+        logger.info("Server: %s", self.server_url)
+
+    def _warm_up_connection(self):
+        """Best-effort pool warmup; failures just surface on the first real call."""
+        try:
+            self.session.get(f'{self.server_url}/api/portfolios', params={'_limit': 1}, timeout=self.timeout)
+        except Exception as e:
+            logger.debug("Connection warmup failed: %s", e)
+
+    def close(self):
+        """Close the underlying HTTP session and its pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _json(response: requests.Response) -> Any:
+        """Decode a JSON response body, using orjson on the raw bytes when available."""
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    def set_project_context(self, portfolio_id: str, application_id: str, project_id: str) -> None:
+        """Precompute the branches URL for a project ahead of the polling loop."""
+        self._branches_endpoint(portfolio_id, application_id, project_id)
+
+    def _branches_endpoint(self, portfolio_id: str, application_id: str, project_id: str) -> str:
+        """Return the absolute branches URL for a project, rebuilt only on context change."""
+        key = (portfolio_id, application_id, project_id)
+        if key != self._project_context:
+            self._project_context = key
+            self._branches_url = (f'{self.server_url}/api/portfolios/{portfolio_id}'
+                                  f'/applications/{application_id}/projects/{project_id}/branches')
+        return self._branches_url
 
     def _make_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
         """Make a request to the Polaris API with error handling."""
-        url = urljoin(self.server_url + '/', endpoint.lstrip('/'))
-        
-        # Get headers for this request
-        extra_headers = kwargs.pop('headers', {})
-        headers = self._get_headers(extra_headers)
-        
-        print(f"Making {method} request to: {url}")
-        print(f"Headers: {headers}")
-        
+        if endpoint.startswith('http'):
+            # Precomputed absolute URLs skip the join entirely
+            url = endpoint
+        else:
+            url = self._base + endpoint.lstrip('/')
+
+        # Per-call headers are merged with the session defaults by requests
+        headers = kwargs.pop('headers', None)
+
+        # Bound every call so a stuck connection can't hang the poll loop
+        kwargs.setdefault('timeout', self.timeout)
+
+        logger.debug("Making %s request to: %s", method, url)
+        logger.debug("Extra headers: %s", headers)
+
         try:
-            response = requests.request(method, url, headers=headers, **kwargs)
-            print(f"Response status: {response.status_code}")
-            
-            if response.status_code != 200:
-                print(f"Response headers: {dict(response.headers)}")
-                print(f"Response text: {response.text}")
-            
+            response = self.session.request(method, url, headers=headers, **kwargs)
+            logger.debug("Response status: %s", response.status_code)
+
+            if not self._encoding_logged:
+                self._encoding_logged = True
+                logger.info("Response Content-Encoding: %s", response.headers.get('Content-Encoding', 'identity'))
+
+            if response.status_code != 200 and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response headers: %s", dict(response.headers))
+                logger.debug("Response text: %s", response.text)
+
             response.raise_for_status()
             return response
+        except requests.exceptions.HTTPError as e:
+            # Permanent 4xx vs retryable 5xx is the caller's call; give it
+            # the status up front
+            logger.error("API request failed with status %s: %s", e.response.status_code, e)
+            logger.debug("Response headers: %s", dict(e.response.headers))
+            logger.debug("Response text: %s", e.response.text)
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Network blip: there is no response to report
+            logger.error("API request did not complete: %s", e)
+            raise
         except requests.exceptions.RequestException as e:
-            print(f"API request failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response status: {e.response.status_code}")
-                print(f"Response headers: {dict(e.response.headers)}")
-                print(f"Response text: {e.response.text}")
+            logger.error("API request failed: %s", e)
+            if e.response is not None:
+                logger.error("Response status: %s", e.response.status_code)
             raise
 
+    def _find_project_in_application(self, portfolio_id: str, application_id: str, project_name: str) -> Optional[Dict[str, Any]]:
+        """Search for a project by name inside one application."""
+        project_response = self._make_request(
+            'GET',
+            f'/api/portfolios/{portfolio_id}/applications/{application_id}/projects',
+            params={'_filter': f'name=="{project_name}"', '_limit': 10}
+        )
+
+        projects = self._json(project_response).get('_items', [])
+
+        for project in projects:
+            logger.info("Found project: %s (ID: %s)", project['name'], project['id'])
+            # Add the IDs we need for API calls
+            project['portfolioId'] = portfolio_id
+            project['applicationId'] = application_id
+            return project
+
+        return None
+
+    def _probe_portfolio(self, portfolio_id: str, application_name: str, project_name: str) -> Optional[Dict[str, Any]]:
+        """Search one portfolio for the application/project pair."""
+        logger.info("Checking portfolio: %s", portfolio_id)
+
+        try:
+            app_response = self._make_request(
+                'GET',
+                f'/api/portfolios/{portfolio_id}/applications',
+                params={'_filter': f'name=="{application_name}"', '_limit': 10}
+            )
+
+            applications = self._json(app_response).get('_items', [])
+        except Exception as e:
+            logger.warning("Error searching applications in portfolio %s: %s", portfolio_id, e)
+            return None
+
+        for application in applications:
+            application_id = application['id']
+            logger.info("Found application: %s (ID: %s)", application['name'], application_id)
+
+            # Search for projects in this application
+            try:
+                project = self._find_project_in_application(portfolio_id, application_id, project_name)
+                if project:
+                    return project
+            except Exception as e:
+                logger.warning("Error searching projects in application %s: %s", application_id, e)
+                continue
+
+        return None
+
+    def _project_cache_path(self, application_name: str, project_name: str) -> str:
+        """Path of the on-disk cache entry for one project lookup."""
+        key = hashlib.sha256(f'{self.server_url}|{application_name}|{project_name}'.encode()).hexdigest()[:16]
+        return os.path.join(tempfile.gettempdir(), f'polaris-project-{key}.json')
+
+    def _load_cached_project_ids(self, application_name: str, project_name: str) -> Optional[Dict[str, Any]]:
+        """Load cached portfolio/application/project IDs if still fresh."""
+        path = self._project_cache_path(application_name, project_name)
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if time.time() - cached.get('cachedAt', 0) > PROJECT_CACHE_TTL_SECONDS:
+                return None
+            return cached
+        except (OSError, ValueError):
+            return None
+
+    def _store_cached_project_ids(self, application_name: str, project_name: str, project: Dict[str, Any]) -> None:
+        """Persist the discovered IDs so later runs can skip the portfolio walk."""
+        path = self._project_cache_path(application_name, project_name)
+        try:
+            with open(path, 'w') as f:
+                json.dump({
+                    'portfolioId': project['portfolioId'],
+                    'applicationId': project['applicationId'],
+                    'id': project['id'],
+                    'cachedAt': time.time()
+                }, f)
+        except OSError as e:
+            logger.debug("Could not write project cache %s: %s", path, e)
+
+    def _invalidate_cached_project_ids(self, application_name: str, project_name: str) -> None:
+        path = self._project_cache_path(application_name, project_name)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
     def find_project_by_name(self, application_name: str, project_name: str) -> Optional[Dict[str, Any]]:
         """Find a project by application and project name."""
-        print(f"Searching for project: {project_name} in application: {application_name}")
-        
+        logger.info("Searching for project: %s in application: %s", project_name, application_name)
+
+        # The ID triple is effectively immutable across CI runs, so try the
+        # on-disk cache first: one verification GET of the project resource
+        # replaces the whole discovery walk
+        cached = self._load_cached_project_ids(application_name, project_name)
+        if cached:
+            try:
+                endpoint = f'/api/portfolios/{cached["portfolioId"]}/applications/{cached["applicationId"]}/projects/{cached["id"]}'
+                project = self._json(self._make_request('GET', endpoint))
+                project['portfolioId'] = cached['portfolioId']
+                project['applicationId'] = cached['applicationId']
+                logger.info("Using cached project IDs for %s/%s", application_name, project_name)
+                return project
+            except Exception as e:
+                logger.info("Cached project IDs are stale (%s), re-discovering", e)
+                self._invalidate_cached_project_ids(application_name, project_name)
+
+        project = self._discover_project(application_name, project_name)
+        if project:
+            self._store_cached_project_ids(application_name, project_name, project)
+        return project
+
+    def _discover_project(self, application_name: str, project_name: str) -> Optional[Dict[str, Any]]:
+        """Discover a project via the applications endpoint or a portfolio walk."""
+        # Fast path: the flat applications endpoint with a server-side name
+        # filter avoids one round trip per portfolio
         try:
-            # First, find all portfolios
-            response = self._make_request('GET', '/api/portfolios')
-            portfolios = response.json().get('_items', [])
-            
-            for portfolio in portfolios:
-                portfolio_id = portfolio['id']
-                print(f"Checking portfolio: {portfolio.get('name', 'Unknown')} (ID: {portfolio_id})")
-                
-                # Search for applications in this portfolio
-                try:
-                    app_response = self._make_request(
-                        'GET', 
-                        f'/api/portfolios/{portfolio_id}/applications',
-                        params={'_filter': f'name=="{application_name}"', '_limit': 10}
-                    )
-                    
-                    applications = app_response.json().get('_items', [])
-                    
-                    for application in applications:
-                        application_id = application['id']
-                        print(f"Found application: {application['name']} (ID: {application_id})")
-                        
-                        # Search for projects in this application
-                        try:
-                            project_response = self._make_request(
-                                'GET',
-                                f'/api/portfolios/{portfolio_id}/applications/{application_id}/projects',
-                                params={'_filter': f'name=="{project_name}"', '_limit': 10}
-                            )
-                            
-                            projects = project_response.json().get('_items', [])
-                            
-                            for project in projects:
-                                print(f"Found project: {project['name']} (ID: {project['id']})")
-                                # Add the IDs we need for API calls
-                                project['portfolioId'] = portfolio_id
-                                project['applicationId'] = application_id
-                                return project
-                                
-                        except Exception as e:
-                            print(f"Error searching projects in application {application_id}: {e}")
-                            continue
-                            
-                except Exception as e:
-                    print(f"Error searching applications in portfolio {portfolio_id}: {e}")
+            app_response = self._make_request(
+                'GET', '/api/applications',
+                params={'_filter': f'name=="{application_name}"', '_limit': 1}
+            )
+
+            for application in self._json(app_response).get('_items', []):
+                portfolio_id = application.get('portfolioId')
+                if not portfolio_id:
                     continue
-            
-            print(f"No project found with name '{project_name}' in application '{application_name}'")
+
+                logger.info("Found application: %s (ID: %s)", application['name'], application['id'])
+                project = self._find_project_in_application(portfolio_id, application['id'], project_name)
+                if project:
+                    return project
+        except Exception as e:
+            logger.warning("Flat application lookup failed, falling back to portfolio scan: %s", e)
+
+        try:
+            # Fall back to walking every portfolio; the per-portfolio probes
+            # are independent idempotent GETs, so fan them out over the
+            # session's connection pool instead of paying one RTT at a time
+            response = self._make_request('GET', '/api/portfolios')
+            portfolios = self._json(response).get('_items', [])
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                futures = [
+                    executor.submit(self._probe_portfolio, portfolio['id'], application_name, project_name)
+                    for portfolio in portfolios
+                ]
+
+                for future in concurrent.futures.as_completed(futures):
+                    project = future.result()
+                    if project:
+                        for other in futures:
+                            other.cancel()
+                        return project
+
+            logger.info("No project found with name '%s' in application '%s'", project_name, application_name)
             return None
-            
+
         except Exception as e:
-            print(f"Error searching for project: {e}")
+            logger.error("Error searching for project: %s", e)
             return None
 
-    def get_project_branches(self, portfolio_id: str, application_id: str, project_id: str) -> list:
-        """Get all branches for a project."""
+    def get_project_branches(self, portfolio_id: str, application_id: str, project_id: str,
+                             name_filter: Optional[str] = None) -> list:
+        """Get branches for a project, optionally filtered by name server-side."""
+        if name_filter is not None:
+            params = {'_filter': f'name=="{name_filter}"', '_limit': 1}
+        else:
+            params = {'_limit': 100}
+
         try:
-            endpoint = f'/api/portfolios/{portfolio_id}/applications/{application_id}/projects/{project_id}/branches'
-            response = self._make_request('GET', endpoint, params={'_limit': 100})
-            return response.json().get('_items', [])
+            endpoint = self._branches_endpoint(portfolio_id, application_id, project_id)
+
+            # Filtered lookups return at most one item, so a plain parse is
+            # fine; for full listings, stream-parse item by item when ijson
+            # is installed instead of materializing the whole body first
+            if name_filter is None and ijson is not None:
+                response = self._make_request('GET', endpoint, params=params, stream=True)
+                try:
+                    response.raw.decode_content = True
+                    return list(ijson.items(response.raw, '_items.item'))
+                finally:
+                    response.close()
+
+            response = self._make_request('GET', endpoint, params=params)
+            return self._json(response).get('_items', [])
         except Exception as e:
-            print(f"Error getting project branches: {e}")
+            logger.error("Error getting project branches: %s", e)
             return []
 
+    def _get_branches_dict(self, portfolio_id: str, application_id: str, project_id: str) -> Dict[str, Dict[str, Any]]:
+        """Full branch listing as a name->branch dict, cached for a short TTL."""
+        key = (portfolio_id, application_id, project_id)
+        cached = self._branches_cache.get(key)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+
+        branches = {b['name']: b for b in self.get_project_branches(portfolio_id, application_id, project_id)}
+        self._branches_cache[key] = (time.monotonic() + BRANCH_CACHE_TTL_SECONDS, branches)
+        return branches
+
     def find_branch_by_name(self, portfolio_id: str, application_id: str, project_id: str, branch_name: str) -> Optional[Dict[str, Any]]:
-        """Find a specific branch by name."""
-        branches = self.get_project_branches(portfolio_id, application_id, project_id)
-        
-        print(f"Available branches: {[branch['name'] for branch in branches]}")
-        
-        for branch in branches:
-            if branch['name'] == branch_name:
+        """Find a specific branch by name, pushing the filter to the server."""
+        try:
+            endpoint = self._branches_endpoint(portfolio_id, application_id, project_id)
+            response = self._make_request(
+                'GET', endpoint,
+                params={'_filter': f'name=="{branch_name}"', '_limit': 1}
+            )
+            branches = self._json(response).get('_items', [])
+            if branches:
+                return branches[0]
+        except Exception as e:
+            # Only if the filtered lookup itself fails do we fall back to the
+            # full listing, served as an O(1) dict lookup and cached briefly
+            # so repeated lookups don't re-download the list
+            logger.warning("Filtered branch lookup failed (%s), using full listing", e)
+            branch = self._get_branches_dict(portfolio_id, application_id, project_id).get(branch_name)
+            if branch:
                 return branch
-        
-        print(f"Branch '{branch_name}' not found in project")
+
+        logger.info("Branch '%s' not found in project", branch_name)
         return None
 
-    def set_default_branch(self, portfolio_id: str, application_id: str, project_id: str, branch_id: str, branch_name: str) -> bool:
-        """Set a branch as the default branch for a project."""
+    def branch_exists(self, portfolio_id: str, application_id: str, project_id: str, branch_name: str) -> bool:
+        """Cheaply probe whether a branch exists yet, preferring a body-less HEAD."""
+        endpoint = self._branches_endpoint(portfolio_id, application_id, project_id)
+        params = {'_filter': f'name=="{branch_name}"', '_limit': 1}
+
+        if self._head_supported:
+            try:
+                response = self._make_request('HEAD', endpoint, params=params)
+                return response.status_code == 200
+            except requests.exceptions.HTTPError as e:
+                if e.response is not None and e.response.status_code == 405:
+                    logger.info("HEAD not supported on branches endpoint, falling back to GET")
+                    self._head_supported = False
+                else:
+                    return False
+            except requests.exceptions.RequestException:
+                return False
+
+        try:
+            response = self._make_request('GET', endpoint, params=params)
+            return bool(self._json(response).get('_items', []))
+        except Exception as e:
+            logger.warning("Error probing for branch '%s': %s", branch_name, e)
+            return False
+
+    def set_default_branch(self, portfolio_id: str, application_id: str, project_id: str, branch: Dict[str, Any]) -> bool:
+        """Set a branch as the default branch for a project.
+
+        The caller passes the branch dict it already fetched, so no extra GET
+        is needed to build the PATCH payload.
+        """
+        branch_name = branch.get('name', '')
+        endpoint = f'{self._branches_endpoint(portfolio_id, application_id, project_id)}/{branch["id"]}'
+
+        # Make PATCH request to update branch with correct headers
+        patch_headers = {
+            'Accept': 'application/vnd.polaris.portfolios.branches-1+json',
+            'Content-Type': 'application/vnd.polaris.portfolios.branches-1+json'
+        }
+
+        # PATCH is partial by definition, so try flipping just isDefault
+        # first; only rebuild and resend the full record if the server
+        # insists on it
+        try:
+            self._make_request('PATCH', endpoint, data=MINIMAL_DEFAULT_PATCH_BODY, headers=patch_headers)
+            logger.info("Successfully set '%s' as default branch (minimal PATCH)", branch_name)
+            return True
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status not in (400, 422):
+                logger.error("Error setting default branch: %s", e)
+                return False
+            logger.info("Server rejected minimal PATCH (%s), retrying with full payload", status)
+        except Exception as e:
+            logger.error("Error setting default branch: %s", e)
+            return False
+
         try:
-            endpoint = f'/api/portfolios/{portfolio_id}/applications/{application_id}/projects/{project_id}/branches/{branch_id}'
-            
-            # Get current branch data first
-            response = self._make_request('GET', endpoint)
-            branch_data = response.json()
-            
             # Create the payload matching your working curl command
             patch_payload = {
-                "name": branch_data.get("name", branch_name),
-                "description": branch_data.get("description", ""),
-                "source": branch_data.get("source", "CI"),
+                "name": branch_name,
+                "description": branch.get("description", ""),
+                "source": branch.get("source", "CI"),
                 "isDefault": True,
-                "autoDeleteSetting": branch_data.get("autoDeleteSetting", False),
-                "autoDeleteSettingsCustomized": branch_data.get("autoDeleteSettingsCustomized", False),
-                "branchRetentionPeriodSetting": branch_data.get("branchRetentionPeriodSetting", 0)
+                "autoDeleteSetting": branch.get("autoDeleteSetting", False),
+                "autoDeleteSettingsCustomized": branch.get("autoDeleteSettingsCustomized", False),
+                "branchRetentionPeriodSetting": branch.get("branchRetentionPeriodSetting", 0)
             }
-            
+
             # Add labelIds if present in the original data
-            if "labelIds" in branch_data:
-                patch_payload["labelIds"] = branch_data["labelIds"]
-            
-            print(f"PATCH payload: {json.dumps(patch_payload, indent=2)}")
-            
-            # Make PATCH request to update branch with correct headers
-            patch_headers = {
-                'Accept': 'application/vnd.polaris.portfolios.branches-1+json',
-                'Content-Type': 'application/vnd.polaris.portfolios.branches-1+json'
-            }
+            if "labelIds" in branch:
+                patch_payload["labelIds"] = branch["labelIds"]
             
-            response = self._make_request(
-                'PATCH', 
-                endpoint, 
-                json=patch_payload,
-                headers=patch_headers
-            )
-            
-            print(f"Successfully set '{branch_name}' as default branch")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("PATCH payload: %s", json.dumps(patch_payload, indent=2))
+
+            self._make_request('PATCH', endpoint, data=_dumps(patch_payload), headers=patch_headers)
+
+            logger.info("Successfully set '%s' as default branch", branch_name)
             return True
-            
+
         except Exception as e:
-            print(f"Error setting default branch: {e}")
+            logger.error("Error setting default branch: %s", e)
             return False
 
 
-def wait_for_scan_completion(api: PolarisAPI, project_data: Dict[str, Any], branch_name: str, max_wait_minutes: int = 30) -> bool:
-    """Wait for the Polaris scan to complete before setting default branch."""
-    print(f"Waiting for scan completion on branch '{branch_name}'...")
-    
+def poll_delays(base_delay: float, max_delay: float, jitter: float):
+    """Yield the jittered exponential-backoff schedule used for scan polling.
+
+    Kept free of any sleeping so the same schedule can drive time.sleep here
+    or an asyncio.sleep-based wait if the script ever tracks several branches
+    concurrently.
+    """
+    attempt = 0
+    while True:
+        yield min(max_delay, base_delay * 2 ** attempt) * (1 + random.uniform(-jitter, jitter))
+        attempt += 1
+
+
+def wait_for_scan_completion(api: PolarisAPI, project_data: Dict[str, Any], branch_name: str, max_wait_minutes: int = 30,
+                             base_delay: float = 2.0, max_delay: float = 60.0, jitter: float = 0.5) -> Optional[Dict[str, Any]]:
+    """Wait for the Polaris scan to complete and return the branch once it appears.
+
+    The portfolios API offers no long-poll, event-stream or webhook variant
+    of the branches endpoint, so completion has to be polled; the backoff
+    schedule keeps the request count low while staying responsive to fast
+    scans.
+    """
+    logger.info("Waiting for scan completion on branch '%s'...", branch_name)
+
     portfolio_id = project_data.get('portfolioId')
-    application_id = project_data.get('applicationId') 
+    application_id = project_data.get('applicationId')
     project_id = project_data.get('id')
-    
+
     if not all([portfolio_id, application_id, project_id]):
-        print("Missing required project identifiers")
-        return False
-    
-    max_attempts = max_wait_minutes * 2  # Check every 30 seconds
+        logger.error("Missing required project identifiers")
+        return None
     
-    for attempt in range(max_attempts):
-        branch = api.find_branch_by_name(portfolio_id, application_id, project_id, branch_name)
-        
+    # Poll with exponential backoff + jitter: aggressive at first (fast scans
+    # are detected within seconds), backing off towards the cap as the scan
+    # runs long, bounded by a wall-clock deadline
+    deadline = time.monotonic() + max_wait_minutes * 60
+    delays = poll_delays(base_delay, max_delay, jitter)
+    attempt = 0
+
+    while True:
+        # Cheap existence probe per iteration; only fetch the branch body
+        # once the probe says it is there (a stale positive just means one
+        # extra GET and another loop iteration)
+        branch = None
+        if api.branch_exists(portfolio_id, application_id, project_id, branch_name):
+            branch = api.find_branch_by_name(portfolio_id, application_id, project_id, branch_name)
+
         if branch:
-            print(f"Branch '{branch_name}' found, scan appears to be complete")
-            return True
-        
-        if attempt < max_attempts - 1:
-            print(f"Branch not found yet, waiting 30 seconds... (attempt {attempt + 1}/{max_attempts})")
-            time.sleep(30)
-    
-    print(f"Timeout waiting for branch '{branch_name}' to appear")
-    return False
+            logger.info("Branch '%s' found, scan appears to be complete", branch_name)
+            return branch
+
+        if time.monotonic() >= deadline:
+            break
+
+        delay = min(next(delays), max(0.0, deadline - time.monotonic()))
+        logger.info("Branch not found yet, waiting %.1f seconds... (attempt %d)", delay, attempt + 1)
+        time.sleep(delay)
+        attempt += 1
+
+    logger.error("Timeout waiting for branch '%s' to appear", branch_name)
+    return None
 
 
 def main():
     """Main function to set the default branch in Polaris."""
+    logging.basicConfig(
+        level=os.getenv('POLARIS_LOG_LEVEL', 'INFO'),
+        format='%(levelname)s: %(message)s'
+    )
+
     # Get required environment variables
     polaris_server_url = os.getenv('POLARIS_SERVER_URL')
     polaris_access_token = os.getenv('POLARIS_ACCESS_TOKEN')
@@ -242,67 +608,57 @@ def main():
     polaris_branch_name = os.getenv('POLARIS_BRANCH_NAME')
     
     if not all([polaris_server_url, polaris_access_token, polaris_application_name, polaris_project_name, polaris_branch_name]):
-        print("Error: Missing required environment variables:")
-        print("- POLARIS_SERVER_URL")
-        print("- POLARIS_ACCESS_TOKEN") 
-        print("- POLARIS_APPLICATION_NAME")
-        print("- POLARIS_PROJECT_NAME")
-        print("- POLARIS_BRANCH_NAME")
+        logger.error("Error: Missing required environment variables:")
+        logger.error("- POLARIS_SERVER_URL")
+        logger.error("- POLARIS_ACCESS_TOKEN")
+        logger.error("- POLARIS_APPLICATION_NAME")
+        logger.error("- POLARIS_PROJECT_NAME")
+        logger.error("- POLARIS_BRANCH_NAME")
         sys.exit(1)
     
-    print(f"Application name: {polaris_application_name}")
-    print(f"Project name: {polaris_project_name}")
-    print(f"Branch name: {polaris_branch_name}")
+    logger.info("Application name: %s", polaris_application_name)
+    logger.info("Project name: %s", polaris_project_name)
+    logger.info("Branch name: %s", polaris_branch_name)
     
     # Initialize Polaris API client
-    api = PolarisAPI(polaris_server_url, polaris_access_token)
-    
-    # Find the project
-    project_data = api.find_project_by_name(polaris_application_name, polaris_project_name)
-    if not project_data:
-        print(f"Could not find project '{polaris_project_name}' in application '{polaris_application_name}'")
-        sys.exit(1)
-    
-    # Extract project information
-    portfolio_id = project_data.get('portfolioId')
-    application_id = project_data.get('applicationId')
-    project_id = project_data.get('id')
-    
-    if not all([portfolio_id, application_id, project_id]):
-        print("Error: Could not extract required project identifiers")
-        sys.exit(1)
-    
-    # Wait for scan to complete
-    if not wait_for_scan_completion(api, project_data, polaris_branch_name):
-        print("Scan did not complete in time, exiting")
-        sys.exit(1)
-    
-    # Find the specific branch
-    branch = api.find_branch_by_name(portfolio_id, application_id, project_id, polaris_branch_name)
-    if not branch:
-        print(f"Branch '{polaris_branch_name}' not found in project '{polaris_project_name}'")
-        sys.exit(1)
-    
-    # Check if it's already the default
-    if branch.get('isDefault', False):
-        print(f"Branch '{polaris_branch_name}' is already the default branch")
-        sys.exit(0)
-    
-    # Set as default branch
-    success = api.set_default_branch(
-        portfolio_id, 
-        application_id, 
-        project_id, 
-        branch['id'], 
-        polaris_branch_name
-    )
-    
-    if success:
-        print(f"Successfully set '{polaris_branch_name}' as the default branch for '{polaris_project_name}'")
-        sys.exit(0)
-    else:
-        print("Failed to set default branch")
-        sys.exit(1)
+    with PolarisAPI(polaris_server_url, polaris_access_token) as api:
+        # Find the project
+        project_data = api.find_project_by_name(polaris_application_name, polaris_project_name)
+        if not project_data:
+            logger.error("Could not find project '%s' in application '%s'", polaris_project_name, polaris_application_name)
+            sys.exit(1)
+
+        # Extract project information
+        portfolio_id = project_data.get('portfolioId')
+        application_id = project_data.get('applicationId')
+        project_id = project_data.get('id')
+
+        if not all([portfolio_id, application_id, project_id]):
+            logger.error("Error: Could not extract required project identifiers")
+            sys.exit(1)
+
+        api.set_project_context(portfolio_id, application_id, project_id)
+
+        # Wait for scan to complete; reuse the branch it already fetched
+        branch = wait_for_scan_completion(api, project_data, polaris_branch_name)
+        if branch is None:
+            logger.error("Scan did not complete in time, exiting")
+            sys.exit(1)
+
+        # Check if it's already the default
+        if branch.get('isDefault', False):
+            logger.info("Branch '%s' is already the default branch", polaris_branch_name)
+            sys.exit(0)
+
+        # Set as default branch
+        success = api.set_default_branch(portfolio_id, application_id, project_id, branch)
+
+        if success:
+            logger.info("Successfully set '%s' as the default branch for '%s'", polaris_branch_name, polaris_project_name)
+            sys.exit(0)
+        else:
+            logger.error("Failed to set default branch")
+            sys.exit(1)
 
 
 if __name__ == "__main__":
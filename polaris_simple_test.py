@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 
+import concurrent.futures
 import os
 import requests
 import json
@@ -24,13 +25,34 @@ def test_exact_curl():
     }
     
     print(f"Request headers: {headers}")
-    
+
+    # One session for every call so the TCP+TLS connection is reused
+    session = requests.Session()
+    session.headers.update(headers)
+
     try:
+        # Fast path: a single filtered query on the flat applications
+        # endpoint instead of walking every portfolio
+        apps_url = f"{server_url}/api/applications"
+        print(f"Testing filtered applications endpoint: {apps_url}")
+
+        apps_response = session.get(
+            apps_url,
+            params={'_filter': 'name=="SRH-hello-java"', '_limit': 1},
+            timeout=30
+        )
+        print(f"Filtered applications response status: {apps_response.status_code}")
+
+        if apps_response.status_code == 200:
+            for app in apps_response.json().get('_items', []):
+                print(f"Found target application: {app['name']} (ID: {app['id']})")
+                return True
+
         # Test portfolios endpoint
         url = f"{server_url}/api/portfolios"
         print(f"Making GET request to: {url}")
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = session.get(url, timeout=30)
         
         print(f"Response status: {response.status_code}")
         print(f"Response headers: {dict(response.headers)}")
@@ -40,28 +62,36 @@ def test_exact_curl():
             data = response.json()
             print(f"Portfolios found: {len(data.get('_items', []))}")
             
-            if data.get('_items'):
-                portfolio = data['_items'][0]
-                portfolio_id = portfolio['id']
-                print(f"First portfolio ID: {portfolio_id}")
-                
-                # Test getting applications
-                apps_url = f"{server_url}/api/portfolios/{portfolio_id}/applications"
-                print(f"Testing applications endpoint: {apps_url}")
-                
-                apps_response = requests.get(apps_url, headers=headers, timeout=30)
-                print(f"Applications response status: {apps_response.status_code}")
-                
-                if apps_response.status_code == 200:
-                    apps_data = apps_response.json()
-                    print(f"Applications found: {len(apps_data.get('_items', []))}")
-                    
-                    # Look for your specific application
-                    for app in apps_data.get('_items', []):
-                        if app['name'] == 'SRH-hello-java':
-                            print(f"Found target application: {app['name']} (ID: {app['id']})")
-                            return True
-                
+            portfolios = data.get('_items', [])
+            if portfolios:
+                def fetch_applications(portfolio):
+                    apps_url = f"{server_url}/api/portfolios/{portfolio['id']}/applications"
+                    print(f"Testing applications endpoint: {apps_url}")
+                    # Filter server-side so only matching applications come back
+                    return session.get(
+                        apps_url,
+                        params={'_filter': 'name=="SRH-hello-java"', '_limit': 10},
+                        timeout=30
+                    )
+
+                # The per-portfolio application requests are independent GETs,
+                # so issue them concurrently instead of one at a time
+                with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                    responses = list(executor.map(fetch_applications, portfolios))
+
+                for apps_response in responses:
+                    print(f"Applications response status: {apps_response.status_code}")
+
+                    if apps_response.status_code == 200:
+                        apps_data = apps_response.json()
+                        print(f"Applications found: {len(apps_data.get('_items', []))}")
+
+                        # Look for your specific application
+                        for app in apps_data.get('_items', []):
+                            if app['name'] == 'SRH-hello-java':
+                                print(f"Found target application: {app['name']} (ID: {app['id']})")
+                                return True
+
             return True
         else:
             print(f"FAILED. Response: {response.text}")
@@ -70,6 +100,8 @@ def test_exact_curl():
     except Exception as e:
         print(f"Error: {e}")
         return False
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     test_exact_curl()